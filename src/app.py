@@ -2,12 +2,21 @@ from __future__ import annotations
 import json
 from datetime import datetime, timezone
 
-from expected_backend.loader import load_tables
+from expected_backend.admission import controller, AdmissionRejected
+from expected_backend.prewarm import access_log, prewarmer
 from expected_backend.filter import apply_filters
 from expected_backend.stats_bar import build_expected_payload
 
+# warm the hottest studies in the background (Lambda init / server start)
+prewarmer.start()
+
 def handler(event, context):
     try:
+        # Function URL GET /metrics -> admission controller / prewarm snapshot
+        if event.get("rawPath", "").rstrip("/").endswith("/metrics"):
+            metrics = {**controller.metrics(), "prewarm": prewarmer.metrics()}
+            return {"statusCode": 200, "headers": {"Content-Type": "application/json"}, "body": json.dumps(metrics)}
+
         body = event.get("body")
         if isinstance(body, str):
             body = json.loads(body)
@@ -16,18 +25,26 @@ def handler(event, context):
 
         study = body["study"]
         filters = body.get("filters", {})
-
-        dfs = load_tables(study)
-        filtered = apply_filters(dfs, filters)
-        expected = build_expected_payload(dfs, filtered)
+        with controller.study(study) as (dfs, admission):
+            filtered = apply_filters(dfs, filters)
+            expected = build_expected_payload(dfs, filtered)
+            # only studies that exist compete for prewarm slots, not typos
+            if any(df is not None for df in dfs.values()):
+                access_log.record(study)
 
         out = {
             "study": study,
             "filters": filters,
             "expected": expected,
-            "meta": {"source": "tsv", "ts": datetime.now(timezone.utc).isoformat()},
+            "meta": {"source": "tsv", "ts": datetime.now(timezone.utc).isoformat(), "admission": admission},
         }
         return {"statusCode": 200, "headers": {"Content-Type": "application/json"}, "body": json.dumps(out)}
+    except AdmissionRejected as e:
+        # retryable when retry_after is set; otherwise the study can never fit this function's memory
+        headers = {"Content-Type": "application/json"}
+        if e.retry_after is not None:
+            headers["Retry-After"] = str(e.retry_after)
+        return {"statusCode": 503, "headers": headers, "body": json.dumps({"error": str(e), "retryable": e.retry_after is not None})}
     except Exception as e:
         return {"statusCode": 500, "headers": {"Content-Type": "application/json"}, "body": json.dumps({"error": str(e)})}
 
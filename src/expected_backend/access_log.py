@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# -------- Environment --------
+# /tmp is the only writable path on Lambda and is per container, so a new
+# container starts with an empty log; point this at shared storage (EFS) to
+# keep the history across containers (SQLite locking over NFS/EFS is not
+# fully reliable; expect the odd lost update), or ship a warm list (PREWARM_LIST)
+ACCESS_LOG_PATH = os.environ.get("ACCESS_LOG_PATH", "/tmp/expected_backend_access.sqlite")
+# hits lose half their weight after this long, so recent traffic ranks first
+ACCESS_HALF_LIFE_S = float(os.environ.get("ACCESS_HALF_LIFE_S", str(24 * 3600)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS study_access (
+    study TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL,
+    score REAL NOT NULL,
+    last_access REAL NOT NULL
+)
+"""
+
+# one statement per study, so concurrent writers never read-modify-write;
+# in SET, bare column names are the stored row and excluded.* the new hits
+_UPSERT = """
+INSERT INTO study_access (study, hits, score, last_access) VALUES (?, ?, ?, ?)
+ON CONFLICT(study) DO UPDATE SET
+    hits = hits + excluded.hits,
+    score = decay(score, last_access, max(last_access, excluded.last_access))
+          + decay(excluded.score, excluded.last_access, max(last_access, excluded.last_access)),
+    last_access = max(last_access, excluded.last_access)
+"""
+
+
+class AccessLog:
+    """
+    Per-study access frequency/recency, persisted in sqlite.
+
+    record() only touches an in-memory buffer so it is safe on the request
+    path; flush() folds the buffer into the table. score is an exponentially
+    decayed hit count (half-life ACCESS_HALF_LIFE_S) as of last_access.
+    Several processes may share the file; each flush is one IMMEDIATE
+    transaction of upserts.
+    """
+
+    def __init__(self, path: str = ACCESS_LOG_PATH, half_life_s: float = ACCESS_HALF_LIFE_S):
+        self.path = path
+        self.half_life_s = half_life_s
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Tuple[int, float]] = {}  # study -> (hits, last_access)
+
+    def _connect(self) -> sqlite3.Connection:
+        # autocommit; _merge opens its own transaction
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            conn.execute(_SCHEMA)
+            conn.create_function("decay", 3, self._decay, deterministic=True)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def _decay(self, score: float, since: float, now: float) -> float:
+        return score * math.pow(0.5, max(0.0, now - since) / self.half_life_s)
+
+    def record(self, study: str, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        with self._lock:
+            hits, _ = self._pending.get(study, (0, now))
+            self._pending[study] = (hits + 1, now)
+
+    def flush(self) -> int:
+        """Write buffered hits; returns the number of studies updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        self._merge([{"study": s, "hits": h, "score": float(h), "last_access": t} for s, (h, t) in pending.items()])
+        return len(pending)
+
+    def _merge(self, entries: List[Dict[str, Any]]) -> None:
+        rows = [(e["study"], int(e["hits"]), float(e["score"]), float(e["last_access"])) for e in entries]
+        conn = self._connect()
+        try:
+            # take the write lock up front: waiting writers then back off on the
+            # busy timeout instead of failing to upgrade a read lock
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(_UPSERT, rows)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _ranked(self, now: float) -> List[Tuple[str, int, float, float]]:
+        """(study, hits, score as of last_access, last_access), hottest first as of now."""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT study, hits, score, last_access FROM study_access").fetchall()
+        finally:
+            conn.close()
+        rows.sort(key=lambda r: (-self._decay(r[2], r[3], now), -r[3]))
+        return rows
+
+    def top(self, k: int, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Hottest k studies by decayed score as of now."""
+        now = time.time() if now is None else now
+        return [
+            {"study": s, "hits": h, "score": round(self._decay(sc, last, now), 4), "last_access": last}
+            for s, h, sc, last in self._ranked(now)[:k]
+        ]
+
+    # -------- warm list (CLI export/import) --------
+    def export_warm(self, k: int, now: Optional[float] = None) -> Dict[str, Any]:
+        """Top k studies. score is as of last_access (not decayed to now), so import decays it once."""
+        self.flush()
+        now = time.time() if now is None else now
+        studies = [
+            {"study": s, "hits": h, "score": sc, "last_access": last} for s, h, sc, last in self._ranked(now)[:k]
+        ]
+        return {"exported_at": now, "half_life_s": self.half_life_s, "studies": studies}
+
+    def import_warm(self, warm: Dict[str, Any]) -> int:
+        entries = [
+            {
+                "study": e["study"],
+                "hits": int(e.get("hits", 1)),
+                "score": float(e.get("score", 1.0)),
+                "last_access": float(e.get("last_access", warm.get("exported_at", time.time()))),
+            }
+            for e in warm.get("studies", [])
+        ]
+        self._merge(entries)
+        return len(entries)
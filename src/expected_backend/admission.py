@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .loader import load_tables, table_object_sizes, frames_nbytes
+
+# -------- Environment --------
+# Budget for study data held in memory. Defaults to 60% of the Lambda memory
+# size (template.yaml: 1024 MB), leaving room for the runtime, pandas and
+# per-request copies made while filtering.
+_LAMBDA_MB = int(os.environ.get("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", "1024"))
+MEMORY_BUDGET_MB = float(os.environ.get("MEMORY_BUDGET_MB") or _LAMBDA_MB * 0.6)
+
+# resident DataFrame bytes per TSV byte before a study has been seen
+# (dtype=str frames measure ~7x their TSV size)
+ADMISSION_EXPANSION = float(os.environ.get("ADMISSION_EXPANSION", "8"))
+# measured studies this many times off the configured expansion don't move it further
+ADMISSION_EXPANSION_DRIFT = 2.0
+# measured sizes kept for estimates (least recently loaded dropped first)
+ADMISSION_HISTORY_MAX = int(os.environ.get("ADMISSION_HISTORY_MAX", "256"))
+ADMISSION_QUEUE_TIMEOUT_S = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_S", "10"))
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "16"))
+ADMISSION_RETRY_AFTER_S = int(os.environ.get("ADMISSION_RETRY_AFTER_S", "5"))
+STUDY_CACHE_TTL_S = float(os.environ.get("STUDY_CACHE_TTL_S", "900"))
+
+
+class AdmissionRejected(Exception):
+    """
+    A study load was refused to protect the process.
+    retry_after is set when the rejection is transient (budget busy) and None
+    when the study can never fit the budget.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Entry:
+    __slots__ = ("dfs", "nbytes", "pins", "loaded_at", "prewarmed")
+
+    def __init__(self, dfs: Dict[str, Any], nbytes: int):
+        self.dfs = dfs
+        self.nbytes = nbytes
+        self.pins = 0
+        self.loaded_at = time.monotonic()
+        self.prewarmed = False  # loaded by prewarm() and not requested since
+
+
+class AdmissionController:
+    """
+    Memory-budgeted cache of loaded studies.
+
+    - Estimates a study's peak load footprint (TSV bytes + parsed frames) from
+      S3 object sizes, or from its measured size once it has been loaded.
+    - Evicts least-recently-used idle studies to make room, queues the load
+      while in-flight requests hold the memory, and raises AdmissionRejected
+      when the queue is full, the wait times out or the study cannot fit.
+    - Concurrent requests for the same study share a single load.
+    """
+
+    def __init__(
+        self,
+        budget_bytes: int,
+        expansion: float = ADMISSION_EXPANSION,
+        queue_timeout_s: float = ADMISSION_QUEUE_TIMEOUT_S,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        retry_after_s: int = ADMISSION_RETRY_AFTER_S,
+        cache_ttl_s: float = STUDY_CACHE_TTL_S,
+        history_max: int = ADMISSION_HISTORY_MAX,
+    ):
+        self.budget_bytes = budget_bytes
+        self.expansion = expansion
+        self.expansion_bounds = (expansion / ADMISSION_EXPANSION_DRIFT, expansion * ADMISSION_EXPANSION_DRIFT)
+        self.queue_timeout_s = queue_timeout_s
+        self.max_queue = max_queue
+        self.retry_after_s = retry_after_s
+        self.cache_ttl_s = cache_ttl_s
+        self.history_max = history_max
+
+        self._cond = threading.Condition()
+        self._cache: "OrderedDict[str, _Entry]" = OrderedDict()  # LRU order, oldest first
+        self._loading: Dict[str, int] = {}  # study -> reserved bytes
+        self._held = 0  # bytes of uncached loads still in use by requests
+        # study -> (object bytes per table, resident bytes), oldest first
+        self._history: "OrderedDict[str, Tuple[Dict[str, int], int]]" = OrderedDict()
+        self._queued = 0
+        self._counters: Dict[str, int] = {
+            "hits": 0,
+            "loads": 0,
+            "queued": 0,
+            "evictions": 0,
+            "expired": 0,
+            "rejected_queue_full": 0,
+            "rejected_timeout": 0,
+            "rejected_too_large": 0,
+            "load_errors": 0,
+            "not_cached": 0,
+            "prewarmed": 0,
+        }
+
+    # -------- estimation --------
+    def estimate(self, study: str) -> Dict[str, Any]:
+        """Estimated {tables, object, resident, peak} bytes for loading `study`."""
+        with self._cond:
+            seen = self._history.get(study)
+            expansion = self.expansion
+        if seen:
+            tables, resident = seen
+        else:
+            # HEADs S3, so outside the lock
+            tables = table_object_sizes(study)
+            resident = int(sum(tables.values()) * expansion)
+        obj = sum(tables.values())
+        # raw TSV bytes and parsed frames coexist while a table is being read
+        return {"tables": tables, "object": obj, "resident": resident, "peak": obj + resident}
+
+    def _record(self, study: str, tables: Dict[str, int], resident: int) -> None:
+        self._history[study] = (tables, resident)
+        self._history.move_to_end(study)
+        while len(self._history) > self.history_max:
+            self._history.popitem(last=False)
+        obj = sum(tables.values())
+        # drift the default towards what real studies measure, but keep one
+        # odd study from swinging the too-large decision for unseen ones
+        lo, hi = self.expansion_bounds
+        ratio = min(max(resident / obj, lo), hi)
+        self.expansion = 0.8 * self.expansion + 0.2 * ratio
+
+    @staticmethod
+    def _cacheable(dfs: Dict[str, Any], est: Dict[str, Any]) -> bool:
+        # loader turns S3 errors into None tables: only cache a load where every
+        # table that exists in S3 actually came back, and something existed at all
+        if not est["object"]:
+            return False
+        return all(dfs.get(t) is not None for t, size in est["tables"].items() if size)
+
+    # -------- accounting (call with self._cond held) --------
+    def _used(self) -> int:
+        return sum(e.nbytes for e in self._cache.values()) + sum(self._loading.values()) + self._held
+
+    def _make_room(self, needed: int) -> bool:
+        """Evict idle studies for `needed` bytes, but only if that alone makes it fit."""
+        used = self._used()
+        if used + needed <= self.budget_bytes:
+            return True
+        idle = sum(e.nbytes for e in self._cache.values() if e.pins == 0)
+        if used - idle + needed > self.budget_bytes:
+            return False  # pinned studies/in-flight loads are the problem; keep the cache
+        self._evict_until(needed)
+        return True
+
+    def _evict_until(self, needed: int) -> None:
+        for study in list(self._cache):
+            if self._used() + needed <= self.budget_bytes:
+                return
+            if self._cache[study].pins == 0:
+                del self._cache[study]
+                self._counters["evictions"] += 1
+
+    def _pin_cached(self, study: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(study)
+        if entry is None:
+            return None
+        if entry.pins == 0 and time.monotonic() - entry.loaded_at > self.cache_ttl_s:
+            del self._cache[study]
+            self._counters["expired"] += 1
+            return None
+        entry.pins += 1
+        entry.prewarmed = False
+        self._cache.move_to_end(study)
+        self._counters["hits"] += 1
+        return entry.dfs
+
+    def _reject(self, reason: str, message: str, retry: bool) -> AdmissionRejected:
+        self._counters[f"rejected_{reason}"] += 1
+        return AdmissionRejected(message, self.retry_after_s if retry else None)
+
+    def _load(self, study: str, est: Dict[str, Any], pins: int) -> Tuple[Dict[str, Any], bool, int]:
+        """
+        Load a study whose reservation is already in self._loading.
+        Returns (dfs, cached, held). An incomplete load is returned but not
+        cached; when pinned its bytes stay counted as `held` until release().
+        """
+        try:
+            dfs = load_tables(study)
+            resident = frames_nbytes(dfs)
+        except Exception:
+            with self._cond:
+                del self._loading[study]
+                self._counters["load_errors"] += 1
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            del self._loading[study]
+            self._counters["loads"] += 1
+            cached = self._cacheable(dfs, est)
+            if cached:
+                self._record(study, est["tables"], resident)
+                entry = _Entry(dfs, resident)
+                entry.pins = pins
+                entry.prewarmed = not pins
+                self._cache[study] = entry
+                # the estimate may have been low; shed idle studies to get back under budget
+                self._evict_until(0)
+            else:
+                self._counters["not_cached"] += 1
+            held = resident if (pins and not cached) else 0
+            self._held += held
+            self._cond.notify_all()
+        return dfs, cached, held
+
+    # -------- public --------
+    def acquire(self, study: str) -> Tuple[Dict[str, Any], str, int]:
+        """
+        Return (dfs, decision, held) with the study pinned in the cache; pair
+        every call with release(study, held). decision is 'hit', 'loaded' or
+        'queued'; held is non-zero when the load could not be cached.
+        """
+        with self._cond:
+            # share a load of the same study already in progress; that is not a
+            # memory wait, so it doesn't count against the queue or its timeout
+            while study in self._loading:
+                self._cond.wait()
+            dfs = self._pin_cached(study)
+            if dfs is not None:
+                return dfs, "hit", 0
+
+        # may HEAD S3, so keep it outside the lock
+        est = self.estimate(study)
+        if est["peak"] > self.budget_bytes:
+            with self._cond:
+                raise self._reject(
+                    "too_large",
+                    f"study {study!r} needs ~{est['peak'] // 2**20} MB, over the "
+                    f"{self.budget_bytes // 2**20} MB memory budget",
+                    retry=False,
+                )
+
+        decision = "loaded"
+        with self._cond:
+            deadline = time.monotonic() + self.queue_timeout_s
+            try:
+                while True:
+                    dfs = self._pin_cached(study)
+                    if dfs is not None:
+                        return dfs, "hit", 0
+                    if study in self._loading:
+                        self._cond.wait()
+                        continue
+                    if self._make_room(est["peak"]):
+                        self._loading[study] = est["peak"]
+                        break
+                    if decision != "queued":
+                        if self._queued >= self.max_queue:
+                            raise self._reject("queue_full", "server busy loading studies, retry later", retry=True)
+                        decision = "queued"
+                        self._queued += 1
+                        self._counters["queued"] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._reject("timeout", f"timed out waiting for memory to load {study!r}", retry=True)
+                    self._cond.wait(remaining)
+            finally:
+                if decision == "queued":
+                    self._queued -= 1
+
+        dfs, _, held = self._load(study, est, pins=1)
+        return dfs, decision, held
+
+    def release(self, study: str, held: int = 0) -> None:
+        with self._cond:
+            if held:
+                self._held -= held
+            else:
+                entry = self._cache.get(study)
+                if entry is not None and entry.pins > 0:
+                    entry.pins -= 1
+            self._evict_until(0)
+            self._cond.notify_all()
+
+    def _prewarmed_bytes(self, excluding: str = "") -> int:
+        return sum(e.nbytes for s, e in self._cache.items() if e.prewarmed and s != excluding)
+
+    def prewarm(self, study: str, cap_bytes: int) -> Optional[int]:
+        """
+        Load (or refresh, once expired) `study` ahead of demand.
+
+        Skips while any request is queued for memory, when the load does not
+        fit in free budget, or when it would take prewarmed-but-unrequested
+        studies over cap_bytes. Never evicts or queues. Once started, its
+        reservation counts like any other load, so a request arriving during
+        it can still be made to wait for that one load.
+
+        Returns the estimated peak bytes loaded, 0 if the study is already
+        cached and fresh, or None if skipped.
+        """
+        with self._cond:
+            entry = self._cache.get(study)
+            if entry is not None and time.monotonic() - entry.loaded_at <= self.cache_ttl_s:
+                return 0
+            if study in self._loading or self._queued:
+                return None
+
+        est = self.estimate(study)
+        if not est["object"]:
+            return None  # missing study
+        with self._cond:
+            entry = self._cache.get(study)
+            if study in self._loading or self._queued or (entry is not None and entry.pins):
+                return None
+            if self._prewarmed_bytes(excluding=study) + est["peak"] > cap_bytes:
+                return None
+            self._cache.pop(study, None)  # expired and idle
+            if self._used() + est["peak"] > self.budget_bytes:
+                return None
+            self._loading[study] = est["peak"]
+        if not self._load(study, est, pins=0)[1]:
+            return None
+        with self._cond:
+            self._counters["prewarmed"] += 1
+        return est["peak"]
+
+    def is_cached(self, study: str) -> bool:
+        with self._cond:
+            return study in self._cache
+
+    @contextmanager
+    def study(self, study: str) -> Iterator[Tuple[Dict[str, Any], str]]:
+        dfs, decision, held = self.acquire(study)
+        try:
+            yield dfs, decision
+        finally:
+            self.release(study, held)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            cached: List[Dict[str, Any]] = [
+                {"study": s, "bytes": e.nbytes, "pins": e.pins, "age_s": round(time.monotonic() - e.loaded_at, 1)}
+                for s, e in self._cache.items()
+            ]
+            return {
+                "budget_bytes": self.budget_bytes,
+                "used_bytes": self._used(),
+                "reserved_bytes": sum(self._loading.values()),
+                "held_uncached_bytes": self._held,
+                "prewarmed_bytes": self._prewarmed_bytes(),
+                "queued_now": self._queued,
+                "expansion": round(self.expansion, 2),
+                "cached": cached,
+                "loading": sorted(self._loading),
+                "history": {s: {"object": sum(t.values()), "resident": r} for s, (t, r) in self._history.items()},
+                "counters": dict(self._counters),
+            }
+
+
+controller = AdmissionController(budget_bytes=int(MEMORY_BUDGET_MB * 2**20))
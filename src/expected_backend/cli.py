@@ -1,14 +1,36 @@
 # expected_backend/cli.py
 import json, argparse
-from .loader import load_tables
-from .filter import apply_filters
-from .stats_bar import build_expected_payload
+from .access_log import AccessLog
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--study", required=True)
-    ap.add_argument("--filters", required=True, help="path to filters.json")
+    ap.add_argument("--study")
+    ap.add_argument("--filters", help="path to filters.json")
+    ap.add_argument("--export-warm", metavar="PATH", help="write the top studies from the access log ('-' for stdout)")
+    ap.add_argument("--import-warm", metavar="PATH", help="merge a warm list into the access log")
+    ap.add_argument("--top", type=int, default=20, help="studies to export with --export-warm")
     args = ap.parse_args()
+
+    if args.export_warm or args.import_warm:
+        log = AccessLog()
+        if args.import_warm:
+            n = log.import_warm(json.loads(open(args.import_warm).read()))
+            print(f"imported {n} studies into {log.path}")
+        if args.export_warm:
+            warm = json.dumps(log.export_warm(args.top), indent=2)
+            if args.export_warm == "-":
+                print(warm)
+            else:
+                open(args.export_warm, "w").write(warm)
+        return
+
+    if not (args.study and args.filters):
+        ap.error("--study and --filters are required")
+    # loader needs DATA_BUCKET/S3 at import; the warm list options above don't
+    from .loader import load_tables
+    from .filter import apply_filters
+    from .stats_bar import build_expected_payload
+
     data = json.loads(open(args.filters).read())
     dfs = load_tables(args.study)
     filtered = apply_filters(dfs, data.get("filters", {}))
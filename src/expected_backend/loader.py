@@ -38,6 +38,9 @@ FILE_SAMPLE_FK_CANDS: List[str] = ["sample.sample_id", "sample_id"]
 # diagnosis disease term columns
 DISEASE_TERM_CANDS: List[str] = ["disease_term", "primary_diagnosis", "diagnosis"]
 
+# tables loaded per study (one TSV each)
+TABLES: List[str] = ["case", "demographic", "diagnosis", "sample", "file"]
+
 
 # -------- S3 / TSV helpers --------
 def _s3_read_tsv(bucket: str, key: str) -> pd.DataFrame:
@@ -52,14 +55,28 @@ def _s3_read_tsv(bucket: str, key: str) -> pd.DataFrame:
     )
 
 
+def _tsv_key(study: str, table: str) -> str:
+    return f"{DATA_PREFIX}{study}-{table}.tsv"
+
+
 def _read_tsv(study: str, table: str) -> Optional[pd.DataFrame]:
-    key = f"{DATA_PREFIX}{study}-{table}.tsv"
     try:
-        return _s3_read_tsv(DATA_BUCKET, key)
+        return _s3_read_tsv(DATA_BUCKET, _tsv_key(study, table))
     except Exception:
         return None
 
 
+def table_object_sizes(study: str) -> Dict[str, int]:
+    """Size in bytes of each study TSV in S3 (HEAD only; missing tables count as 0)."""
+    sizes: Dict[str, int] = {}
+    for table in TABLES:
+        try:
+            sizes[table] = int(s3.head_object(Bucket=DATA_BUCKET, Key=_tsv_key(study, table))["ContentLength"])
+        except Exception:
+            sizes[table] = 0
+    return sizes
+
+
 # -------- DataFrame utilities (reused by other modules) --------
 def first_col(df: Any, cands: List[str]) -> Optional[str]:
     if df is None or getattr(df, "empty", True):
@@ -97,15 +114,14 @@ def unique_ids(df: Any, cands: List[str], limit: int = 2000) -> List[str]:
     return sorted(df[col].astype(str).unique().tolist())[:limit]
 
 
+def frames_nbytes(dfs: Dict[str, Any]) -> int:
+    """In-memory size of loaded tables, including string payloads."""
+    return int(sum(df.memory_usage(deep=True).sum() for df in dfs.values() if df is not None))
+
+
 # -------- Public: load all needed tables with normalized 'pid' --------
 def load_tables(study: str) -> Dict[str, Any]:
-    dfs: Dict[str, Any] = {
-        "case": _read_tsv(study, "case"),
-        "demographic": _read_tsv(study, "demographic"),
-        "diagnosis": _read_tsv(study, "diagnosis"),
-        "sample": _read_tsv(study, "sample"),
-        "file": _read_tsv(study, "file"),
-    }
+    dfs: Dict[str, Any] = {t: _read_tsv(study, t) for t in TABLES}
 
     # add unified 'pid' to participant-level tables
     for k in ("case", "demographic", "diagnosis"):
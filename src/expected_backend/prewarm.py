@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .access_log import AccessLog
+from .admission import AdmissionController, controller
+
+# -------- Environment --------
+PREWARM_TOP_K = int(os.environ.get("PREWARM_TOP_K", "5"))  # 0 disables prewarming (not access logging)
+PREWARM_INTERVAL_S = float(os.environ.get("PREWARM_INTERVAL_S", "300"))
+PREWARM_TIME_BUDGET_S = float(os.environ.get("PREWARM_TIME_BUDGET_S", "30"))
+# share of the admission budget prewarmed studies may take (peak estimate)
+PREWARM_MEMORY_FRACTION = float(os.environ.get("PREWARM_MEMORY_FRACTION", "0.5"))
+# optional warm list (cli --export-warm) used to fill the top-K when the access
+# log is short, e.g. baked into the image so fresh Lambda containers know what is hot
+PREWARM_LIST = os.environ.get("PREWARM_LIST", "")
+ACCESS_LOG_FLUSH_S = float(os.environ.get("ACCESS_LOG_FLUSH_S", "30"))
+
+
+class Prewarmer:
+    """
+    Background thread that flushes the access log every ACCESS_LOG_FLUSH_S
+    and, unless top_k is 0, loads the top-K studies into the admission
+    controller's cache ahead of demand.
+
+    Warming runs once at start() and then every PREWARM_INTERVAL_S, reloading
+    studies whose cache entry has expired. Each round stops after
+    PREWARM_TIME_BUDGET_S. It only uses free memory, keeps prewarmed studies
+    nobody has requested yet under PREWARM_MEMORY_FRACTION of the budget, and
+    backs off while requests are queued for memory. It never evicts; a
+    request that arrives during a prewarm load may wait for that one load.
+    """
+
+    def __init__(
+        self,
+        controller: AdmissionController,
+        access_log: AccessLog,
+        top_k: int = PREWARM_TOP_K,
+        interval_s: float = PREWARM_INTERVAL_S,
+        time_budget_s: float = PREWARM_TIME_BUDGET_S,
+        memory_fraction: float = PREWARM_MEMORY_FRACTION,
+        flush_s: float = ACCESS_LOG_FLUSH_S,
+        seeds: Optional[List[str]] = None,
+    ):
+        self.controller = controller
+        self.access_log = access_log
+        self.top_k = top_k
+        self.interval_s = interval_s
+        self.time_budget_s = time_budget_s
+        self.memory_fraction = memory_fraction
+        self.flush_s = flush_s
+        self.seeds = seeds or []
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_round: Dict[str, Any] = {}
+
+    def candidates(self) -> List[str]:
+        studies = [e["study"] for e in self.access_log.top(self.top_k)]
+        studies += [s for s in self.seeds if s not in studies]
+        return studies[: self.top_k]
+
+    def run_once(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        self.access_log.flush()
+        cap = int(self.controller.budget_bytes * self.memory_fraction)
+        warmed: List[str] = []
+        skipped: List[str] = []
+        for study in self.candidates():
+            if self._stop.is_set() or time.monotonic() - started > self.time_budget_s:
+                skipped.append(study)
+                continue
+            try:
+                used = self.controller.prewarm(study, cap)
+            except Exception:
+                used = None
+            if used is None:
+                skipped.append(study)
+            elif used:
+                warmed.append(study)
+        self._last_round = {
+            "ts": time.time(),
+            "duration_s": round(time.monotonic() - started, 3),
+            "warmed": warmed,
+            "skipped": skipped,
+        }
+        return self._last_round
+
+    def _loop(self) -> None:
+        next_round = 0.0
+        while True:
+            try:
+                if self.top_k > 0 and time.monotonic() >= next_round:
+                    next_round = time.monotonic() + self.interval_s
+                    self.run_once()
+                else:
+                    self.access_log.flush()
+            except Exception:
+                pass  # e.g. access log unwritable; try again next tick rather than stop warming
+            if self._stop.wait(min(self.flush_s, self.interval_s) if self.top_k > 0 else self.flush_s):
+                return
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        atexit.register(self._final_flush)
+        # runs even with top_k=0: it is also what flushes the access log
+        self._thread = threading.Thread(target=self._loop, name="prewarm", daemon=True)
+        self._thread.start()
+
+    def _final_flush(self) -> None:
+        try:
+            self.access_log.flush()
+        except Exception:
+            pass  # losing the last few hits beats a noisy shutdown
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.access_log.flush()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"top_k": self.top_k, "running": self._thread is not None, "last_round": self._last_round}
+
+
+def read_warm_list(path: str) -> List[str]:
+    """Study names from a warm list file, hottest first."""
+    if not path:
+        return []
+    try:
+        with open(path) as fh:
+            return [e["study"] for e in json.load(fh).get("studies", [])]
+    except (OSError, ValueError, KeyError, AttributeError):
+        # a bad warm list only costs cold starts; don't fail the import
+        return []
+
+
+access_log = AccessLog()
+prewarmer = Prewarmer(controller, access_log, seeds=read_warm_list(PREWARM_LIST))
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+Local end-to-end load test for the expected results API.
+
+Starts an in-process S3 stand-in preloaded with synthetic studies, then replays
+a weighted mix of filter requests against:
+  - handler: app.handler called in-process (the Lambda code path)
+  - server:  local_server.py over HTTP (the Flask code path)
+
+Each configuration (target x concurrency/rate) reports p50/p95/p99 latency,
+requests per second, errors and peak memory (for the handler target that is
+the harness process itself, S3 stand-in included). Results are written as JSON so
+runs can be compared across code changes with --compare.
+
+Examples:
+  python loadtest.py
+  python loadtest.py --target handler --concurrency 1,8,32 --requests 500
+  python loadtest.py --target server --rate 5,20 --concurrency 16
+  python loadtest.py --compare loadtest-results/before.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import formatdate
+from hashlib import md5
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+HERE = Path(__file__).resolve().parent
+BUCKET = "loadtest-bucket"
+PREFIX = "tsv/"
+
+BREEDS = ["Golden Retriever", "Labrador Retriever", "Boxer", "Beagle", "Rottweiler", "Mixed Breed"]
+SEXES = ["Male", "Female"]
+DISEASE_TERMS = ["Lymphoma", "Osteosarcoma", "Hemangiosarcoma", "Melanoma", "Mast Cell Tumor"]
+
+
+# -------- Synthetic studies --------
+def _tsv(header: List[str], rows: List[List[str]]) -> bytes:
+    lines = ["\t".join(header)] + ["\t".join(r) for r in rows]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def synthetic_study(study: str, participants: int, seed: int) -> Dict[str, bytes]:
+    """Return {table: tsv_bytes} shaped like the real study TSVs."""
+    rng = random.Random(f"{seed}:{study}")
+    case, demo, diag, sample, files = [], [], [], [], []
+    for i in range(participants):
+        pid = f"{study}-C{i:06d}"
+        case.append([pid, study])
+        demo.append([pid, rng.choice(BREEDS), rng.choice(SEXES)])
+        diag.append([pid, rng.choice(DISEASE_TERMS)])
+        for s in range(rng.randint(1, 3)):
+            sid = f"{pid}-S{s}"
+            sample.append([sid, pid])
+            for f in range(rng.randint(1, 4)):
+                fid = f"{sid}-F{f}"
+                files.append([fid, sid, f"{fid}.bam"])
+    # study-level files carry no sample FK
+    for f in range(max(1, participants // 50)):
+        fid = f"{study}-STUDY-F{f}"
+        files.append([fid, "", f"{fid}.pdf"])
+    return {
+        "case": _tsv(["case_record_id", "study_code"], case),
+        "demographic": _tsv(["case_record_id", "breed", "sex"], demo),
+        "diagnosis": _tsv(["case_record_id", "disease_term"], diag),
+        "sample": _tsv(["sample_id", "case_record_id"], sample),
+        "file": _tsv(["file_id", "sample.sample_id", "file_name"], files),
+    }
+
+
+def build_objects(sizes: List[int], seed: int) -> Tuple[Dict[str, bytes], List[str]]:
+    objects: Dict[str, bytes] = {}
+    studies: List[str] = []
+    for i, n in enumerate(sizes):
+        study = f"synthetic-{i}-{n}"
+        studies.append(study)
+        for table, body in synthetic_study(study, n, seed).items():
+            objects[f"{PREFIX}{study}-{table}.tsv"] = body
+    return objects, studies
+
+
+def default_mix(studies: List[str]) -> List[Dict[str, Any]]:
+    mix: List[Dict[str, Any]] = []
+    for study in studies:
+        mix += [
+            {"study": study, "filters": {}, "weight": 1},
+            {"study": study, "filters": {"Breed": BREEDS[:2]}, "weight": 2},
+            {"study": study, "filters": {"Breed": [BREEDS[0]], "Sex": ["Male"]}, "weight": 2},
+            {"study": study, "filters": {"Diagnosis.disease_term": DISEASE_TERMS[:2]}, "weight": 1},
+        ]
+    return mix
+
+
+# -------- S3 stand-in (GetObject / HeadObject only) --------
+class _S3Handler(BaseHTTPRequestHandler):
+    objects: Dict[str, bytes] = {}
+
+    def log_message(self, *args: Any) -> None:  # keep the report readable
+        pass
+
+    def _key(self) -> Optional[str]:
+        path = urllib.parse.unquote(self.path.split("?", 1)[0])
+        host = self.headers.get("Host", "")
+        if host.startswith(BUCKET + "."):  # virtual-hosted style
+            return path.lstrip("/")
+        bucket, _, key = path.lstrip("/").partition("/")  # path style
+        return key if bucket == BUCKET else None
+
+    def _respond(self, send_body: bool) -> None:
+        key = self._key()
+        body = self.objects.get(key) if key is not None else None
+        if body is None:
+            err = b"<?xml version=\"1.0\"?><Error><Code>NoSuchKey</Code><Message>Not found</Message></Error>"
+            self.send_response(404)
+            self.send_header("Content-Type", "application/xml")
+            self.send_header("Content-Length", str(len(err)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(err)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/tab-separated-values")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", f"\"{md5(body).hexdigest()}\"")
+        self.send_header("Last-Modified", formatdate(usegmt=True))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self._respond(send_body=True)
+
+    def do_HEAD(self) -> None:
+        self._respond(send_body=False)
+
+
+def start_s3_standin(objects: Dict[str, bytes]) -> ThreadingHTTPServer:
+    handler = type("S3Handler", (_S3Handler,), {"objects": objects})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def service_env(s3_url: str, workdir: str) -> Dict[str, str]:
+    """Environment that points loader.py at the stand-in instead of real S3."""
+    return {
+        "DATA_BUCKET": BUCKET,
+        "DATA_PREFIX": PREFIX,
+        "AWS_ENDPOINT_URL_S3": s3_url,
+        "AWS_ACCESS_KEY_ID": "loadtest",
+        "AWS_SECRET_ACCESS_KEY": "loadtest",
+        "AWS_DEFAULT_REGION": "us-east-1",
+        # keep synthetic studies out of the real access log / prewarm list
+        "ACCESS_LOG_PATH": os.path.join(workdir, "access.sqlite"),
+    }
+
+
+# -------- Memory (Linux /proc; best effort elsewhere) --------
+def _reset_peak_rss(pid: int) -> None:
+    # writing 5 to clear_refs resets VmHWM so each configuration gets its own peak
+    try:
+        Path(f"/proc/{pid}/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb(pid: int) -> Optional[float]:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if pid == os.getpid():
+        import resource
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return None
+
+
+# -------- Targets --------
+# (call(payload) -> (status, body), admission metrics(), pid to sample memory from, stop())
+Call = Callable[[Dict[str, Any]], Tuple[int, str]]
+Target = Tuple[Call, Callable[[], Dict[str, Any]], int, Callable[[], None]]
+
+# what peak_rss_mb covers for each target
+RSS_SCOPE = {
+    "handler": "harness process: handler plus the S3 stand-in's objects and client threads",
+    "server": "local_server.py process",
+}
+
+
+def _handler_target() -> Target:
+    sys.path.insert(0, str(HERE))
+    from app import handler
+
+    def call(payload: Dict[str, Any]) -> Tuple[int, str]:
+        result = handler({"body": json.dumps(payload)}, None)
+        return int(result["statusCode"]), result["body"]
+
+    def metrics() -> Dict[str, Any]:
+        return json.loads(handler({"rawPath": "/metrics"}, None)["body"])
+
+    return call, metrics, os.getpid(), lambda: None
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _server_target(env: Dict[str, str]) -> Target:
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, str(HERE / "local_server.py")],
+        cwd=str(HERE),
+        env={**os.environ, **env, "PORT": str(port), "DEBUG": "0"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    url = f"{base}/mock-api"
+
+    def call(payload: Dict[str, Any]) -> Tuple[int, str]:
+        req = urllib.request.Request(
+            url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=120) as resp:
+                return resp.status, resp.read().decode("utf-8")
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode("utf-8")
+
+    def metrics() -> Dict[str, Any]:
+        with urllib.request.urlopen(f"{base}/metrics", timeout=30) as resp:
+            return json.loads(resp.read())
+
+    deadline = time.monotonic() + 30
+    while True:
+        if proc.poll() is not None:
+            raise RuntimeError(f"local_server.py exited with code {proc.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                break
+        except OSError:
+            if time.monotonic() > deadline:
+                proc.kill()
+                raise RuntimeError("local_server.py did not start within 30s")
+            time.sleep(0.2)
+
+    def stop() -> None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    return call, metrics, proc.pid, stop
+
+
+# -------- Runner --------
+def _percentile(sorted_vals: List[float], p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    # nearest rank
+    idx = min(len(sorted_vals) - 1, max(0, math.ceil(p / 100 * len(sorted_vals)) - 1))
+    return sorted_vals[idx]
+
+
+def run_config(
+    call: Call,
+    pid: int,
+    schedule: List[Dict[str, Any]],
+    concurrency: int,
+    rate: Optional[float],
+) -> Dict[str, Any]:
+    """
+    Closed loop (rate=None): `concurrency` workers issue requests back to back.
+    Open loop (rate=R): requests are released every 1/R seconds and latency is
+    measured from the scheduled release, so queueing delay is not hidden.
+    """
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def one(payload: Dict[str, Any], scheduled: float) -> None:
+        try:
+            status = call(payload)[0]
+        except Exception as e:  # transport failures count as errors, not crashes
+            status = type(e).__name__
+        elapsed = (time.perf_counter() - scheduled) * 1000
+        with lock:
+            latencies.append(elapsed)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    _reset_peak_rss(pid)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if rate:
+            for i, payload in enumerate(schedule):
+                release = start + i / rate
+                delay = release - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(one, payload, release)
+        else:
+            for payload in schedule:
+                pool.submit(lambda p=payload: one(p, time.perf_counter()))
+    duration = time.perf_counter() - start
+
+    latencies.sort()
+    ok = statuses.get("200", 0)
+    return {
+        "concurrency": concurrency,
+        "rate": rate,
+        "requests": len(schedule),
+        "duration_s": round(duration, 3),
+        "rps": round(len(schedule) / duration, 2) if duration else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 2),
+            "p95": round(_percentile(latencies, 95), 2),
+            "p99": round(_percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        },
+        "errors": len(schedule) - ok,
+        "status_counts": statuses,
+        "peak_rss_mb": _peak_rss_mb(pid),
+    }
+
+
+def _sanity_check(call: Call, target: str, study: str) -> None:
+    # loader swallows S3 errors and returns empty tables, so a misconfigured
+    # stand-in would otherwise look like a very fast service
+    status, raw = call({"study": study, "filters": {}})
+    try:
+        body = json.loads(raw)
+    except ValueError:
+        body = {}
+    count = body.get("expected", {}).get("count", 0) if status == 200 else 0
+    if not count:
+        raise RuntimeError(f"sanity check failed: {target} returned {status} with no participants for {study} ({raw[:200]})")
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=str(HERE), capture_output=True, text=True, timeout=10
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _csv(value: str, cast: Callable[[str], Any]) -> List[Any]:
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def _print_result(target: str, r: Dict[str, Any]) -> None:
+    mode = f"rate={r['rate']}/s c={r['concurrency']}" if r["rate"] else f"c={r['concurrency']}"
+    lat = r["latency_ms"]
+    print(
+        f"{target:<8} {mode:<18} rps={r['rps']:<8} p50={lat['p50']:<9} p95={lat['p95']:<9} "
+        f"p99={lat['p99']:<9} errors={r['errors']:<5} peak_rss_mb={r['peak_rss_mb']}"
+    )
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    def key(target: str, r: Dict[str, Any]) -> Tuple[str, int, Optional[float]]:
+        return (target, r["concurrency"], r["rate"])
+
+    base = {key(t, r): r for t, rs in baseline["results"].items() for r in rs}
+    print(f"\nvs baseline {baseline.get('git_rev')} ({baseline.get('ts')}):")
+    for target, rs in current["results"].items():
+        for r in rs:
+            b = base.get(key(target, r))
+            if not b:
+                continue
+
+            def pct(new: float, old: float) -> str:
+                return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+            print(
+                f"{target:<8} c={r['concurrency']:<4} rate={r['rate']!s:<6} "
+                f"rps {pct(r['rps'], b['rps'])}  "
+                f"p50 {pct(r['latency_ms']['p50'], b['latency_ms']['p50'])}  "
+                f"p99 {pct(r['latency_ms']['p99'], b['latency_ms']['p99'])}  "
+                f"peak_rss {pct(r['peak_rss_mb'] or 0, b['peak_rss_mb'] or 0)}"
+            )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--target", default="handler,server", help="comma list of: handler, server")
+    ap.add_argument("--concurrency", default="1,4,16", help="comma list of worker counts")
+    ap.add_argument("--rate", default="", help="comma list of open-loop request rates (req/s); closed loop if empty")
+    ap.add_argument("--requests", type=int, default=200, help="requests per configuration")
+    ap.add_argument("--warmup", type=int, default=5, help="unmeasured requests before each target")
+    ap.add_argument("--studies", default="500,2000,10000", help="participants per synthetic study")
+    ap.add_argument("--mix", help="JSON file: [{\"study\", \"filters\", \"weight\"}, ...]")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help="results JSON path (default: loadtest-results/<ts>.json)")
+    ap.add_argument("--compare", help="previous results JSON to diff against")
+    args = ap.parse_args()
+
+    objects, studies = build_objects(_csv(args.studies, int), args.seed)
+    s3 = start_s3_standin(objects)
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    env = service_env(f"http://127.0.0.1:{s3.server_address[1]}", workdir)
+    os.environ.update(env)
+
+    mix = json.loads(Path(args.mix).read_text()) if args.mix else default_mix(studies)
+    rng = random.Random(args.seed)
+    weights = [float(m.get("weight", 1)) for m in mix]
+    payloads = [{"study": m["study"], "filters": m.get("filters", {})} for m in mix]
+
+    concurrencies = _csv(args.concurrency, int)
+    rates = _csv(args.rate, float) or [None]
+    results: Dict[str, List[Dict[str, Any]]] = {}
+
+    for target in _csv(args.target, str):
+        if target == "handler":
+            call, metrics, pid, stop = _handler_target()
+        elif target == "server":
+            call, metrics, pid, stop = _server_target(env)
+        else:
+            raise SystemExit(f"unknown target: {target}")
+        try:
+            _sanity_check(call, target, studies[0])
+            for payload in rng.choices(payloads, weights, k=args.warmup):
+                call(payload)
+            results[target] = []
+            for rate in rates:
+                for c in concurrencies:
+                    schedule = rng.choices(payloads, weights, k=args.requests)
+                    before = metrics()["counters"]
+                    r = run_config(call, pid, schedule, c, rate)
+                    # controller counters are cumulative; keep this configuration's share
+                    after = metrics()["counters"]
+                    r["admission"] = {k: v - before.get(k, 0) for k, v in after.items()}
+                    results[target].append(r)
+                    _print_result(target, r)
+        finally:
+            stop()
+    s3.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "git_rev": _git_rev(),
+        "python": sys.version.split()[0],
+        "args": vars(args),
+        "studies": {s: sum(len(v) for k, v in objects.items() if k.startswith(f"{PREFIX}{s}-")) for s in studies},
+        "peak_rss_scope": {t: RSS_SCOPE[t] for t in results},
+        "results": results,
+    }
+    out = Path(args.out) if args.out else HERE / "loadtest-results" / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    if "handler" in results:
+        print(f"\nnote: handler peak_rss_mb is the {RSS_SCOPE['handler']}")
+    print(f"\nresults written to {out}")
+
+    if args.compare:
+        compare(report, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    main()
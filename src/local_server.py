@@ -4,6 +4,7 @@ Simple local server to run the expected results API
 """
 from flask import Flask, request, jsonify
 import json
+import os
 from app import handler
 
 app = Flask(__name__)
@@ -23,13 +24,21 @@ def mock_api():
         # Call the handler
         result = handler(event, None)
         
-        # Return the response
-        return jsonify(json.loads(result['body'])), result['statusCode']
+        # Return the response (keep handler headers such as Retry-After)
+        headers = {k: v for k, v in result.get('headers', {}).items() if k != 'Content-Type'}
+        return jsonify(json.loads(result['body'])), result['statusCode'], headers
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Admission controller / study cache metrics"""
+    result = handler({"rawPath": "/metrics"}, None)
+    return jsonify(json.loads(result['body'])), result['statusCode']
+
 if __name__ == '__main__':
     print("🚀 Starting local expected results API server...")
-    print("📍 API will be available at: http://localhost:3000/mock-api")
-    app.run(host='0.0.0.0', port=3000, debug=True)
+    port = int(os.environ.get('PORT', 3000))
+    print(f"📍 API will be available at: http://localhost:{port}/mock-api")
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get('DEBUG', '1') != '0')
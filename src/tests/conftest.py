@@ -0,0 +1,54 @@
+import os
+import sys
+
+# loader.py reads DATA_BUCKET and builds an S3 client at import; tests never reach S3
+os.environ.setdefault("DATA_BUCKET", "test-bucket")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time  # noqa: E402
+
+import pytest  # noqa: E402
+
+from expected_backend import admission  # noqa: E402
+from expected_backend.loader import TABLES  # noqa: E402
+
+
+class FakeS3:
+    """Stands in for loader's S3 reads: per-study table sizes and what load_tables returns."""
+
+    def __init__(self, monkeypatch):
+        self.sizes = {}  # study -> object bytes per table
+        self.resident = {}  # study -> frames_nbytes result
+        self.failing = set()  # (study, table) reads that come back None
+        self.gate = None  # threading.Event that load_tables waits on
+        self.delay = 0.0  # seconds each load takes
+        self.loads = 0
+        monkeypatch.setattr(admission, "table_object_sizes", self.table_object_sizes)
+        monkeypatch.setattr(admission, "load_tables", self.load_tables)
+        monkeypatch.setattr(admission, "frames_nbytes", lambda dfs: dfs["_nbytes"])
+
+    def add(self, study, object_bytes, resident_bytes):
+        self.sizes[study] = {t: object_bytes // len(TABLES) for t in TABLES}
+        self.resident[study] = resident_bytes
+
+    def table_object_sizes(self, study):
+        return dict(self.sizes.get(study, {t: 0 for t in TABLES}))
+
+    def load_tables(self, study):
+        self.loads += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        time.sleep(self.delay)
+        dfs = {
+            t: (None if (study, t) in self.failing or not self.sizes.get(study, {}).get(t) else f"{study}:{t}")
+            for t in TABLES
+        }
+        dfs["_nbytes"] = self.resident.get(study, 0)
+        return dfs
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    return FakeS3(monkeypatch)
+
@@ -0,0 +1,45 @@
+from expected_backend.access_log import AccessLog
+
+DAY = 24 * 3600
+
+
+def test_recent_traffic_outranks_old_traffic(tmp_path):
+    log = AccessLog(str(tmp_path / "access.sqlite"), half_life_s=DAY)
+    now = 1_000_000.0
+    for _ in range(10):
+        log.record("old", now=now - 7 * DAY)
+    for _ in range(3):
+        log.record("new", now=now)
+    log.flush()
+    assert [e["study"] for e in log.top(2, now=now)] == ["new", "old"]
+
+
+def test_warm_list_round_trip(tmp_path):
+    src = AccessLog(str(tmp_path / "a.sqlite"))
+    for study, hits in (("a", 3), ("b", 1)):
+        for _ in range(hits):
+            src.record(study)
+    warm = src.export_warm(10)
+
+    dst = AccessLog(str(tmp_path / "b.sqlite"))
+    assert dst.import_warm(warm) == 2
+    assert [(e["study"], e["hits"]) for e in dst.top(10)] == [("a", 3), ("b", 1)]
+
+
+
+def test_warm_list_round_trip_keeps_ranking_across_ages(tmp_path):
+    now = 1_000_000.0
+    src = AccessLog(str(tmp_path / "a.sqlite"), half_life_s=DAY)
+    for _ in range(40):
+        src.record("old", now=now - 4 * DAY)  # 40 / 2**4 = 2.5 as of now
+    for _ in range(2):
+        src.record("new", now=now)
+    src.flush()
+    before = src.top(2, now=now)
+    warm = src.export_warm(2, now=now)
+
+    dst = AccessLog(str(tmp_path / "b.sqlite"), half_life_s=DAY)
+    dst.import_warm(warm)
+    assert dst.top(2, now=now) == before
+    assert [e["study"] for e in before] == ["old", "new"]
+    assert before[0]["score"] == 2.5
@@ -0,0 +1,152 @@
+import threading
+import time
+
+import pytest
+
+from expected_backend.admission import AdmissionController, AdmissionRejected
+
+MB = 2**20
+
+
+def _controller(**kw):
+    kw.setdefault("budget_bytes", 100 * MB)
+    kw.setdefault("expansion", 4)
+    kw.setdefault("queue_timeout_s", 0.5)
+    return AdmissionController(**kw)
+
+
+def test_hit_after_load(s3):
+    s3.add("a", 5 * MB, 20 * MB)
+    ac = _controller()
+    with ac.study("a") as (_, decision):
+        assert decision == "loaded"
+    with ac.study("a") as (_, decision):
+        assert decision == "hit"
+    assert s3.loads == 1
+
+
+def test_transient_s3_failure_is_not_cached(s3):
+    s3.add("a", 5 * MB, 20 * MB)
+    s3.failing.add(("a", "case"))
+    ac = _controller()
+    with ac.study("a") as (dfs, _):
+        assert dfs["case"] is None
+    assert not ac.is_cached("a")
+
+    s3.failing.clear()
+    with ac.study("a") as (dfs, decision):
+        assert decision == "loaded"
+        assert dfs["case"] == "a:case"
+    assert ac.is_cached("a")
+    assert ac.metrics()["counters"]["not_cached"] == 1
+
+
+def test_unknown_studies_are_not_retained(s3):
+    ac = _controller(history_max=3)
+    for i in range(20):
+        with ac.study(f"bogus-{i}"):
+            pass
+    m = ac.metrics()
+    assert m["cached"] == [] and m["history"] == {}
+    for i in range(5):
+        s3.add(f"s{i}", MB, 2 * MB)
+        with ac.study(f"s{i}"):
+            pass
+    assert list(ac.metrics()["history"]) == ["s2", "s3", "s4"]
+
+
+def test_same_study_burst_shares_one_load(s3):
+    s3.add("a", MB, 2 * MB)
+    s3.gate = threading.Event()
+    ac = _controller(max_queue=1, queue_timeout_s=0.05)
+    results = []
+
+    def request():
+        try:
+            with ac.study("a") as (_, decision):
+                results.append(decision)
+        except AdmissionRejected as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=request) for _ in range(16)]
+    for t in threads:
+        t.start()
+    time.sleep(0.2)  # well past queue_timeout_s while the load is held
+    s3.gate.set()
+    for t in threads:
+        t.join(5)
+
+    assert s3.loads == 1
+    assert sorted(results) == ["hit"] * 15 + ["loaded"]
+    counters = ac.metrics()["counters"]
+    assert counters["queued"] == 0
+    assert counters["rejected_queue_full"] == counters["rejected_timeout"] == 0
+
+
+def test_evicts_least_recently_used_idle_study(s3):
+    for name in ("a", "b", "c"):
+        s3.add(name, 5 * MB, 30 * MB)  # peak estimate 25 MB, resident 30 MB
+    ac = _controller(budget_bytes=70 * MB)
+    for name in ("a", "b", "a", "c"):
+        with ac.study(name):
+            pass
+    cached = [e["study"] for e in ac.metrics()["cached"]]
+    assert cached == ["a", "c"]
+    assert ac.metrics()["counters"]["evictions"] == 1
+
+
+def test_pinned_studies_queue_then_time_out(s3):
+    s3.add("a", 10 * MB, 60 * MB)
+    s3.add("b", 10 * MB, 60 * MB)
+    ac = _controller(budget_bytes=100 * MB, queue_timeout_s=0.1)
+    with ac.study("a"):
+        with pytest.raises(AdmissionRejected) as exc:
+            ac.acquire("b")
+    assert exc.value.retry_after == ac.retry_after_s
+    counters = ac.metrics()["counters"]
+    assert counters["queued"] == 1 and counters["rejected_timeout"] == 1
+    # once "a" is released it can be evicted to make room
+    with ac.study("b") as (_, decision):
+        assert decision == "loaded"
+
+
+def test_no_eviction_when_it_cannot_make_room(s3):
+    s3.add("a", 10 * MB, 60 * MB)
+    s3.add("b", 10 * MB, 60 * MB)  # peak estimate 50 MB
+    s3.add("c", MB, 10 * MB)
+    ac = _controller(budget_bytes=100 * MB, queue_timeout_s=0.1)
+    with ac.study("c"):
+        pass
+    with ac.study("a"):
+        # evicting idle "c" would free 10 MB, not enough while "a" is pinned
+        with pytest.raises(AdmissionRejected):
+            ac.acquire("b")
+        assert ac.is_cached("c")
+    assert ac.metrics()["counters"]["evictions"] == 0
+
+
+def test_uncached_load_stays_counted_until_release(s3):
+    s3.add("a", 5 * MB, 20 * MB)
+    s3.failing.add(("a", "file"))
+    ac = _controller()
+    with ac.study("a"):
+        assert ac.metrics()["used_bytes"] == 20 * MB
+    assert ac.metrics()["used_bytes"] == 0
+
+
+def test_too_large_is_not_retryable(s3):
+    s3.add("huge", 30 * MB, 0)
+    ac = _controller(budget_bytes=100 * MB, expansion=4)
+    with pytest.raises(AdmissionRejected) as exc:
+        ac.acquire("huge")
+    assert exc.value.retry_after is None
+
+
+def test_outlier_study_drift_is_clamped(s3):
+    s3.add("odd", MB, 1000 * MB)
+    ac = _controller(budget_bytes=2000 * MB, expansion=4)
+    for _ in range(20):
+        with ac.study("odd"):
+            pass
+        ac._cache.clear()
+    assert ac.expansion <= 8
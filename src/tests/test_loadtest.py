@@ -0,0 +1,23 @@
+import pytest
+
+from loadtest import _percentile
+
+
+@pytest.mark.parametrize(
+    "n, p, expected",
+    [
+        (100, 50, 50),
+        (100, 95, 95),
+        (100, 99, 99),
+        (300, 95, 285),
+        (500, 95, 475),
+        (10, 99, 10),
+        (1, 50, 1),
+    ],
+)
+def test_percentile_is_nearest_rank(n, p, expected):
+    assert _percentile(list(range(1, n + 1)), p) == expected
+
+
+def test_percentile_of_empty_is_zero():
+    assert _percentile([], 99) == 0.0
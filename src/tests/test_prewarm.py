@@ -0,0 +1,112 @@
+import time
+
+from expected_backend.access_log import AccessLog
+from expected_backend.admission import AdmissionController
+from expected_backend.prewarm import Prewarmer
+
+MB = 2**20
+
+
+def _prewarmer(tmp_path, **kw):
+    controller = AdmissionController(
+        budget_bytes=kw.pop("budget_bytes", 100 * MB),
+        expansion=4,
+        queue_timeout_s=0.5,
+        cache_ttl_s=kw.pop("cache_ttl_s", 900),
+    )
+    log = AccessLog(str(tmp_path / "access.sqlite"))
+    kw.setdefault("top_k", 3)
+    kw.setdefault("memory_fraction", 1.0)
+    return Prewarmer(controller, log, **kw)
+
+
+def _hits(log, **studies):
+    for study, hits in studies.items():
+        for _ in range(hits):
+            log.record(study)
+    log.flush()
+
+
+def test_warms_top_k_then_seeds(s3, tmp_path):
+    for name in ("a", "b", "c", "d"):
+        s3.add(name, MB, 2 * MB)
+    pw = _prewarmer(tmp_path, seeds=["c", "a", "d"])
+    _hits(pw.access_log, b=3, a=1)
+
+    assert pw.candidates() == ["b", "a", "c"]
+    assert pw.run_once()["warmed"] == ["b", "a", "c"]
+    assert not pw.controller.is_cached("d")
+    with pw.controller.study("b") as (_, decision):
+        assert decision == "hit"
+
+
+def test_missing_studies_are_skipped(s3, tmp_path):
+    s3.add("a", MB, 2 * MB)
+    pw = _prewarmer(tmp_path, seeds=["typo", "a"])
+    round_ = pw.run_once()
+    assert round_["warmed"] == ["a"] and round_["skipped"] == ["typo"]
+
+
+def test_expired_entries_are_refreshed(s3, tmp_path):
+    s3.add("hot", MB, 2 * MB)
+    pw = _prewarmer(tmp_path, seeds=["hot"], cache_ttl_s=0.05)
+    assert pw.run_once()["warmed"] == ["hot"]
+    time.sleep(0.1)
+    assert pw.run_once()["warmed"] == ["hot"]
+    with pw.controller.study("hot") as (_, decision):
+        assert decision == "hit"
+    assert s3.loads == 2
+
+
+def test_fresh_entries_are_not_reloaded(s3, tmp_path):
+    s3.add("hot", MB, 2 * MB)
+    pw = _prewarmer(tmp_path, seeds=["hot"])
+    pw.run_once()
+    assert pw.run_once()["warmed"] == []
+    assert s3.loads == 1
+
+
+def test_time_budget_ends_the_round(s3, tmp_path):
+    for name in ("a", "b", "c"):
+        s3.add(name, MB, 2 * MB)
+    s3.delay = 0.1
+    pw = _prewarmer(tmp_path, seeds=["a", "b", "c"], time_budget_s=0.05)
+    round_ = pw.run_once()
+    assert round_["warmed"] == ["a"] and round_["skipped"] == ["b", "c"]
+
+
+def test_memory_cap_counts_earlier_rounds(s3, tmp_path):
+    for name in ("a", "b", "c"):
+        s3.add(name, 4 * MB, 12 * MB)  # peak estimate 20 MB
+    pw = _prewarmer(tmp_path, top_k=2, memory_fraction=0.3, seeds=["a", "b"])
+    assert pw.run_once()["warmed"] == ["a"]
+    # "a" (12 MB resident) is still unrequested: "c" would take it over the 30 MB cap
+    pw.seeds = ["c"]
+    assert pw.run_once()["warmed"] == []
+    # once requested, "a" no longer counts against the cap
+    with pw.controller.study("a"):
+        pass
+    assert pw.run_once()["warmed"] == ["c"]
+
+
+def test_backs_off_while_requests_are_queued(s3, tmp_path):
+    s3.add("a", MB, 2 * MB)
+    pw = _prewarmer(tmp_path, seeds=["a"])
+    pw.controller._queued = 1
+    assert pw.run_once()["skipped"] == ["a"]
+    pw.controller._queued = 0
+    assert pw.run_once()["warmed"] == ["a"]
+
+
+def test_top_k_zero_still_flushes_access_log(s3, tmp_path):
+    pw = _prewarmer(tmp_path, top_k=0, flush_s=0.02)
+    pw.start()
+    try:
+        pw.access_log.record("a")
+        deadline = time.monotonic() + 2
+        while not pw.access_log.top(1) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert [e["study"] for e in pw.access_log.top(1)] == ["a"]
+        assert s3.loads == 0
+    finally:
+        pw.stop()